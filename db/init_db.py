@@ -8,13 +8,19 @@ DB_PATH = Path(__file__).parent / "sales.db"
 
 def init_database():
     """Create and populate the sales database."""
-    # Remove existing database
-    if DB_PATH.exists():
-        DB_PATH.unlink()
+    # Remove existing database (and its WAL files, which must not outlive it)
+    for suffix in ("", "-wal", "-shm"):
+        path = DB_PATH.with_name(DB_PATH.name + suffix)
+        if path.exists():
+            path.unlink()
 
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
 
+    # WAL + NORMAL sync: far fewer fsyncs per write, still safe against corruption
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+
     # Create table
     cursor.execute("""
         CREATE TABLE sales (
@@ -70,16 +76,20 @@ def init_database():
         (12, "Home & Garden", 22800.00),
     ]
 
-    for month, category, amount in sales_2025:
-        date = f"2025-{month:02d}-15"
-        cursor.execute(
-            """
-            INSERT INTO sales (date, year, month, category, amount)
-            VALUES (?, 2025, ?, ?, ?)
-        """,
-            (date, month, category, amount),
-        )
+    rows = [
+        (f"2025-{month:02d}-15", month, category, amount)
+        for month, category, amount in sales_2025
+    ]
 
+    # Insert all rows with one prepared statement inside a single transaction
+    cursor.execute("BEGIN")
+    cursor.executemany(
+        """
+        INSERT INTO sales (date, year, month, category, amount)
+        VALUES (?, 2025, ?, ?, ?)
+    """,
+        rows,
+    )
     conn.commit()
 
     # Verify data
@@ -1,18 +1,33 @@
 import os
-import requests
+import asyncio
+import functools
+import hashlib
+import multiprocessing
+import queue
+import sqlite3
+import threading
+import httpx
+import numpy as np
 from pathlib import Path
-import chromadb
-# from docling.document_converter import DocumentConverter
+from tqdm import tqdm
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from vector_store import get_vector_store
 
 # Configuration
 OLLAMA_API_BASE = "http://localhost:11434"
 EMBEDDING_MODEL = "granite-embedding:30m"  # Small, fast embedding model
-CHROMA_DB_PATH = "./chromadb_storage"
+EMBEDDING_CACHE_PATH = "./embedding_cache.db"
+BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))  # Chunks per /api/embed request
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "4"))  # Batch requests in flight at once
+INDEX_WORKERS = min(4, os.cpu_count() or 1)  # Documents processed in parallel by index_folder
+FOLDER_EMBEDDING_WORKERS = 2  # Per-process cap on in-flight batches when indexing a folder
+PROGRESS_DISABLE = None  # tqdm's disable flag - None hides the bar when stdout isn't a terminal
+BATCH_TIMEOUT = httpx.Timeout(300.0, connect=10.0)  # Large batches can take a while
 
-def get_embedding(text: str) -> list:
+async def get_embedding(client: httpx.AsyncClient, text: str) -> list:
     """Get embeddings from Ollama"""
     try:
-        response = requests.post(
+        response = await client.post(
             f"{OLLAMA_API_BASE}/api/embeddings",
             json={"model": EMBEDDING_MODEL, "prompt": text}
         )
@@ -22,21 +37,160 @@ def get_embedding(text: str) -> list:
         print(f"Error getting embedding: {e}")
         raise
 
+async def get_embeddings_batch(client: httpx.AsyncClient, texts: list[str]) -> list[list[float]]:
+    """Get embeddings for several texts in one request to Ollama's /api/embed"""
+    try:
+        response = await client.post(
+            f"{OLLAMA_API_BASE}/api/embed",
+            json={"model": EMBEDDING_MODEL, "input": texts}
+        )
+        # Older Ollama versions don't have /api/embed
+        if response.status_code == 404:
+            embeddings = None
+        else:
+            response.raise_for_status()
+            embeddings = response.json().get("embeddings")
+    except Exception as e:
+        print(f"Error getting batch embeddings: {e}")
+        raise
+
+    # Fall back to the per-text endpoint
+    if not embeddings:
+        return [await get_embedding(client, text) for text in texts]
+    return embeddings
+
+async def _embed_all(batches: list[list[str]], on_batch):
+    """Embed all batches concurrently over one pooled keep-alive client.
+
+    on_batch(batch_number, embeddings) is called as each batch finishes, in
+    completion order.
+    """
+    # Ollama embeds a batch sequentially, so keep several batches in flight
+    semaphore = asyncio.Semaphore(EMBEDDING_WORKERS)
+    limits = httpx.Limits(
+        max_connections=EMBEDDING_WORKERS,
+        max_keepalive_connections=EMBEDDING_WORKERS,
+        keepalive_expiry=30.0
+    )
+
+    async def embed_batch(client: httpx.AsyncClient, batch_number: int, batch: list[str]):
+        async with semaphore:
+            embeddings = await get_embeddings_batch(client, batch)
+        on_batch(batch_number, embeddings)
+        progress.update(1)
+
+    with tqdm(total=len(batches), desc="    Embedding", unit="batch", disable=PROGRESS_DISABLE) as progress:
+        async with httpx.AsyncClient(limits=limits, timeout=BATCH_TIMEOUT) as client:
+            await asyncio.gather(*[embed_batch(client, i, batch) for i, batch in enumerate(batches)])
+
+def _cache_key(text: str) -> bytes:
+    """Cache key for a chunk - embeddings are only reusable for the same model"""
+    return hashlib.sha256(f"{EMBEDDING_MODEL}\0{text}".encode("utf-8")).digest()
+
+def _quantize(vector: np.ndarray) -> bytes:
+    """Pack a vector as its float32 scale followed by int8 components (~4x smaller)"""
+    scale = max(float(np.abs(vector).max()), 1e-12) / 127
+    quantized = np.clip(np.round(vector / scale), -127, 127).astype(np.int8)
+    return np.float32(scale).tobytes() + quantized.tobytes()
+
+def _dequantize(blob: bytes) -> np.ndarray:
+    """Unpack a vector stored by _quantize, renormalized to unit length"""
+    scale = np.frombuffer(blob, dtype=np.float32, count=1)[0]
+    vector = np.frombuffer(blob, dtype=np.int8, offset=4).astype(np.float32) * scale
+    # Rounding to int8 shifts the norm slightly - restore it so inner product stays cosine
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+def _open_embedding_cache() -> sqlite3.Connection:
+    """Open the on-disk embedding cache, creating it if needed"""
+    # Folder indexing writes from several processes - wait for the lock instead of failing
+    conn = sqlite3.connect(EMBEDDING_CACHE_PATH, timeout=30)
+    conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vec BLOB NOT NULL)")
+    return conn
+
+def embed_chunks_streaming(chunks: list[str], on_batch):
+    """
+    Embed chunks, reusing cached embeddings and only sending misses to Ollama.
+    Results are handed to on_batch(positions, embeddings) as soon as they are
+    ready - cache hits first, then each Ollama batch as it completes - where
+    positions are the indexes into chunks that the embedding rows belong to.
+    """
+    keys = [_cache_key(chunk) for chunk in chunks]
+    positions_by_key = {}
+    for position, key in enumerate(keys):
+        positions_by_key.setdefault(key, []).append(position)
+
+    conn = _open_embedding_cache()
+    try:
+        # Hand cache hits over BATCH_SIZE keys at a time, like the Ollama batches
+        cached = set()
+        unique_keys = list(positions_by_key)
+        for start in range(0, len(unique_keys), BATCH_SIZE):
+            vectors = {}
+            for key in unique_keys[start:start + BATCH_SIZE]:
+                row = conn.execute("SELECT vec FROM embeddings WHERE key = ?", (key,)).fetchone()
+                if row:
+                    vectors[key] = _dequantize(row[0])
+            if vectors:
+                positions = [position for key in vectors for position in positions_by_key[key]]
+                on_batch(positions, np.stack([vectors[keys[position]] for position in positions]))
+                cached.update(vectors)
+
+        hits = sum(len(positions_by_key[key]) for key in cached)
+        print(f"    {hits}/{len(chunks)} chunks found in embedding cache")
+
+        # Identical chunks share a key, so each distinct miss is embedded once
+        miss_keys = [key for key in positions_by_key if key not in cached]
+        batch_keys = [miss_keys[i:i + BATCH_SIZE] for i in range(0, len(miss_keys), BATCH_SIZE)]
+
+        def store_batch(batch_number: int, embeddings: list[list[float]]):
+            vectors = np.asarray(embeddings, dtype=np.float32)
+            # Normalize once here so cosine similarity is a plain dot product downstream
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            batch = batch_keys[batch_number]
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vec) VALUES (?, ?)",
+                    [(key, _quantize(vector)) for key, vector in zip(batch, vectors)]
+                )
+            rows = [row for row, key in enumerate(batch) for _ in positions_by_key[key]]
+            positions = [position for key in batch for position in positions_by_key[key]]
+            on_batch(positions, vectors[rows])
+
+        if batch_keys:
+            batches = [[chunks[positions_by_key[key][0]] for key in batch] for batch in batch_keys]
+            asyncio.run(_embed_all(batches, store_batch))
+    finally:
+        conn.close()
+
+def embed_chunks(chunks: list[str]) -> np.ndarray:
+    """Embed chunks into one contiguous float32 matrix (row i belongs to chunks[i])"""
+    embeddings = None
+
+    def collect(positions: list[int], vectors: np.ndarray):
+        nonlocal embeddings
+        if embeddings is None:
+            embeddings = np.empty((len(chunks), vectors.shape[1]), dtype=np.float32)
+        embeddings[positions] = vectors
+
+    embed_chunks_streaming(chunks, collect)
+    return embeddings
+
+@functools.cache
+def ensure_embedding_model():
+    """Pull the embedding model if Ollama doesn't have it (checked once per process)"""
+    response = httpx.get(f"{OLLAMA_API_BASE}/api/tags", timeout=10.0)
+    response.raise_for_status()
+    names = {model["name"] for model in response.json()["models"]}
+    # Untagged models are listed as "<name>:latest"
+    if EMBEDDING_MODEL not in names and f"{EMBEDDING_MODEL}:latest" not in names:
+        print(f"  → Pulling {EMBEDDING_MODEL} model (first time only)...")
+        os.system(f"ollama pull {EMBEDDING_MODEL}")
+
 def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> list:
     """Simple chunking by character count with overlap"""
-    chunks = []
-    start = 0
-    
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end].strip()
-        
-        if chunk:  # Only add non-empty chunks
-            chunks.append(chunk)
-        
-        start = end - overlap  # Move forward with overlap
-    
-    return chunks
+    step = max(chunk_size - overlap, 1)
+    windows = (text[start:start + chunk_size].strip() for start in range(0, len(text), step))
+    return [chunk for chunk in windows if chunk]  # Only keep non-empty chunks
 
 def convert_to_markdown(file_path: str) -> str:
     """Extract text using PyMuPDF (fast and efficient)"""
@@ -55,12 +209,11 @@ def convert_to_markdown(file_path: str) -> str:
     
     # For PDF files using PyMuPDF
     elif file_ext == '.pdf':
-        text = ""
-        doc = fitz.open(file_path)
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            text += page.get_text()
-        doc.close()
+        with fitz.open(file_path) as doc:
+            # Join once instead of += per page, which is quadratic in document size.
+            # Pages without a text layer (e.g. scans) are skipped.
+            parts = [page_text for page in doc.pages() if (page_text := page.get_text())]
+        text = "".join(parts)
         print(f"  ✓ Extracted text ({len(text)} characters)")
         return text
     
@@ -73,13 +226,11 @@ def convert_to_markdown(file_path: str) -> str:
         print(f"  ✓ Converted to markdown ({len(markdown_text)} characters)")
         return markdown_text
 
-def process_document(file_path: str):
+def load_chunks(file_path: str) -> list:
     """
-    Main indexing pipeline:
+    First indexing steps:
     1. Convert to markdown using PyMuPDF or Docling
     2. Chunk the text
-    3. Generate embeddings with Ollama
-    4. Store in ChromaDB
     """
     print(f"\n{'='*60}")
     print(f"Processing: {Path(file_path).name}")
@@ -92,52 +243,154 @@ def process_document(file_path: str):
     print("  → Chunking text...")
     chunks = chunk_text(markdown_text)
     print(f"  ✓ Created {len(chunks)} chunks")
+    if not chunks:
+        print("  ✗ No text found in document, nothing to index")
+    return chunks
+
+def _chunk_ids(file_path: str, count: int) -> tuple:
+    """Unique IDs and metadata for each chunk of a document"""
+    doc_name = Path(file_path).stem
+    ids = [f"{doc_name}_chunk_{i}" for i in range(count)]
+    metadatas = [{"source": doc_name, "chunk_id": i} for i in range(count)]
+    return ids, metadatas
+
+def _print_indexed(file_path: str, count: int):
+    """Print the end-of-document summary"""
+    print(f"  ✓ Stored {count} chunks in database")
+    print(f"\n{'='*60}")
+    print(f"✓ Successfully indexed: {Path(file_path).name}")
+    print(f"{'='*60}\n")
+
+def prepare_document(file_path: str):
+    """
+    Indexing steps that don't touch the vector database: load, chunk and
+    embed a document. Returns (chunks, embeddings), or None if it has no text.
+    The caller checks the embedding model first (see index_folder).
+    """
+    chunks = load_chunks(file_path)
+    if not chunks:
+        return None
+    
+    # Step 3: Generate embeddings
+    print("  → Generating embeddings...")
+    embeddings = embed_chunks(chunks)
+    print(f"  ✓ Generated {len(embeddings)} embeddings")
+    return chunks, embeddings
+
+def store_document(file_path: str, chunks: list, embeddings: np.ndarray):
+    """Store a prepared document's chunks in the vector database"""
+    print(f"  → Storing {Path(file_path).name} in vector database...")
+    store = get_vector_store()
+    ids, metadatas = _chunk_ids(file_path, len(chunks))
+    store.add(ids, embeddings, chunks, metadatas)
+    store.persist()
+    _print_indexed(file_path, len(chunks))
+
+def process_document(file_path: str):
+    """
+    Main indexing pipeline:
+    1. Convert to markdown using PyMuPDF or Docling
+    2. Chunk the text
+    3. Generate embeddings with Ollama
+    4. Store in the vector database (ChromaDB or FAISS)
+    Steps 3 and 4 overlap: a writer thread stores each batch as soon as it
+    is embedded, so memory scales with the batch size, not the document.
+    """
+    chunks = load_chunks(file_path)
+    if not chunks:
+        return
     
     # Step 3: Check if embedding model is available
     print(f"  → Checking embedding model ({EMBEDDING_MODEL})...")
-    check_model = os.popen(f"ollama list | grep {EMBEDDING_MODEL}").read()
-    if not check_model:
-        print(f"  → Pulling {EMBEDDING_MODEL} model (first time only)...")
-        os.system(f"ollama pull {EMBEDDING_MODEL}")
+    ensure_embedding_model()
     
-    # Step 4: Generate embeddings
-    print("  → Generating embeddings...")
-    embeddings = []
-    for i, chunk in enumerate(chunks):
-        if (i + 1) % 10 == 0 or i == 0:
-            print(f"    Embedding chunk {i+1}/{len(chunks)}")
-        embedding = get_embedding(chunk)
-        embeddings.append(embedding)
-    print(f"  ✓ Generated {len(embeddings)} embeddings")
+    # Step 4: Generate embeddings and store them as they arrive
+    print("  → Generating embeddings and storing in vector database...")
+    store = get_vector_store()
+    ids, metadatas = _chunk_ids(file_path, len(chunks))
     
-    # Step 5: Store in ChromaDB
-    print("  → Storing in ChromaDB...")
-    client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
-    collection = client.get_or_create_collection(name="documents")
+    # Bounded so a slow store makes embedding wait instead of piling up batches
+    writes = queue.Queue(maxsize=EMBEDDING_WORKERS)
+    errors = []
     
-    # Create unique IDs for each chunk
-    doc_name = Path(file_path).stem
-    ids = [f"{doc_name}_chunk_{i}" for i in range(len(chunks))]
-    
-    # Add to collection
-    collection.add(
-        embeddings=embeddings,
-        documents=chunks,
-        ids=ids,
-        metadatas=[{"source": doc_name, "chunk_id": i} for i in range(len(chunks))]
-    )
+    def writer():
+        while (item := writes.get()) is not None:
+            if errors:
+                continue  # Drain the queue after a failure
+            positions, vectors = item
+            try:
+                store.add(
+                    [ids[i] for i in positions],
+                    vectors,
+                    [chunks[i] for i in positions],
+                    [metadatas[i] for i in positions]
+                )
+            except Exception as e:
+                errors.append(e)
     
-    print(f"  ✓ Stored {len(chunks)} chunks in database")
-    print(f"\n{'='*60}")
-    print(f"✓ Successfully indexed: {Path(file_path).name}")
-    print(f"{'='*60}\n")
+    writer_thread = threading.Thread(target=writer)
+    writer_thread.start()
+    try:
+        embed_chunks_streaming(chunks, lambda positions, vectors: writes.put((positions, vectors)))
+    finally:
+        writes.put(None)
+        writer_thread.join()
+    if errors:
+        raise errors[0]
+    store.persist()
+    
+    _print_indexed(file_path, len(chunks))
+
+def _init_folder_worker():
+    """Process pool initializer - keep N workers from flooding the local Ollama server"""
+    global EMBEDDING_WORKERS, PROGRESS_DISABLE
+    EMBEDDING_WORKERS = FOLDER_EMBEDDING_WORKERS
+    # Several bars redrawing on one terminal garble each other
+    PROGRESS_DISABLE = True
+
+def index_folder(folder_path: str):
+    """
+    Index every file in a folder. Documents are converted, chunked and embedded
+    in parallel worker processes; this process is the only one writing to the
+    vector database.
+    """
+    files = sorted(p for p in Path(folder_path).iterdir() if p.is_file() and not p.name.startswith("."))
+    if not files:
+        print(f"No documents found in {folder_path}")
+        return
+    
+    # Check once here - workers would each query Ollama and could pull the model concurrently
+    print(f"Checking embedding model ({EMBEDDING_MODEL})...")
+    ensure_embedding_model()
+    
+    print(f"Indexing {len(files)} documents with {min(INDEX_WORKERS, len(files))} workers...")
+    failed = []
+    with ProcessPoolExecutor(
+        max_workers=min(INDEX_WORKERS, len(files)),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_folder_worker
+    ) as executor:
+        futures = {executor.submit(prepare_document, str(path)): path for path in files}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                prepared = future.result()
+                if prepared is not None:
+                    store_document(str(path), *prepared)
+            except Exception as e:
+                print(f"❌ Error indexing {path.name}: {e}")
+                failed.append(path.name)
+    
+    print(f"✓ Indexed {len(files) - len(failed)}/{len(files)} documents")
+    if failed:
+        print(f"  Failed: {', '.join(failed)}")
 
 # For standalone testing
 if __name__ == "__main__":
     import sys
     
     if len(sys.argv) < 2:
-        print("Usage: python index.py <path_to_document>")
+        print("Usage: python index.py <path_to_document_or_folder>")
         sys.exit(1)
     
     file_path = sys.argv[1]
@@ -146,4 +399,7 @@ if __name__ == "__main__":
         print(f"Error: File not found - {file_path}")
         sys.exit(1)
     
-    process_document(file_path)
\ No newline at end of file
+    if os.path.isdir(file_path):
+        index_folder(file_path)
+    else:
+        process_document(file_path)
\ No newline at end of file
@@ -23,7 +23,7 @@ def show_menu():
 def index_document():
     """Handle document indexing"""
     print("\n--- Add Document ---")
-    file_path = input("Enter the full path to your document: ").strip()
+    file_path = input("Enter the full path to your document or folder: ").strip()
     
     # Validate file exists
     if not os.path.exists(file_path):
@@ -32,6 +32,12 @@ def index_document():
     
     # Import and run indexing
     try:
+        if os.path.isdir(file_path):
+            from index import index_folder
+            print(f"\nProcessing folder: {file_path}")
+            index_folder(file_path)
+            return
+        
         from index import process_document
         print(f"\nProcessing document: {file_path}")
         process_document(file_path)
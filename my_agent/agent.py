@@ -1,34 +1,14 @@
-from google.adk.agents.llm_agent import Agent
-from google.adk.models.lite_llm import LiteLlm
-from my_agent.tools.search_documents import search_documents
-from my_agent.tools.query_sales import query_sales
-from my_agent.tools.calculate_metrics import calculate_metrics
-from my_agent.tools.export_to_pdf import export_to_pdf
+import functools
 import os
 from dotenv import load_dotenv
-import litellm
 
 load_dotenv()
 
-# Suppress LiteLLM debug info (Provider List URL)
-litellm.suppress_debug_info = True
-
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 #print("API KEY:", OPENROUTER_API_KEY[:10] + "..." if OPENROUTER_API_KEY else "Not found")
 
-model = LiteLlm(
-    model='openrouter/nvidia/nemotron-3-nano-30b-a3b:free',
-    api_key=OPENROUTER_API_KEY,
-    api_base='https://openrouter.ai/api/v1',
-)
-
-print("Setting up the root agent...")
-
-root_agent = Agent(
-    model=model,
-    name='root_agent',
-    description='A sales analyst assistant that analyzes data, compares forecasts with actuals, and generates reports.',
-    instruction="""#System role
+# Static system prompt - identical on every request, so providers can cache its prefix
+INSTRUCTION = """#System role
     You are a Sales Data Reporting Engine.  You provide direct data analysis and reports. 
      
 # OUTPUT FORMAT PROTOCOL (STRICT COMPLIANCE REQUIRED)
@@ -86,7 +66,46 @@ When user asks to compare forecast with actual data:
 - When a PDF is successfully generated, always tell the user the file was created and include the file path.
 - Never assume data exists - always report what was found and what was missing.
 
-""",
-    tools=[search_documents, query_sales, calculate_metrics, export_to_pdf]
-)
-
+"""
+
+
+@functools.cache
+def get_root_agent():
+    """Build the root agent on first use, so importing this module stays cheap"""
+    from google.adk.agents.llm_agent import Agent
+    from google.adk.models.lite_llm import LiteLlm
+    from my_agent.tools.search_documents import search_documents
+    from my_agent.tools.query_sales import query_sales
+    from my_agent.tools.calculate_metrics import calculate_metrics
+    from my_agent.tools.export_to_pdf import export_to_pdf
+    import litellm
+
+    # Suppress LiteLLM debug info (Provider List URL)
+    litellm.suppress_debug_info = True
+
+    # Optionally reuse LLM responses for identical requests (e.g. a repeated question)
+    if os.getenv("LLM_RESPONSE_CACHE", "").lower() in ("1", "true", "yes"):
+        litellm.cache = litellm.Cache(type="local")
+
+    model = LiteLlm(
+        model='openrouter/nvidia/nemotron-3-nano-30b-a3b:free',
+        api_key=OPENROUTER_API_KEY,
+        api_base='https://openrouter.ai/api/v1',
+    )
+
+    print("Setting up the root agent...")
+
+    return Agent(
+        model=model,
+        name='root_agent',
+        description='A sales analyst assistant that analyzes data, compares forecasts with actuals, and generates reports.',
+        instruction=INSTRUCTION,
+        tools=[search_documents, query_sales, calculate_metrics, export_to_pdf]
+    )
+
+
+def __getattr__(name):
+    # adk web looks up `root_agent` on this module - build it on first access
+    if name == "root_agent":
+        return get_root_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
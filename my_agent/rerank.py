@@ -0,0 +1,48 @@
+"""Cosine-similarity reranking of retrieved document chunks."""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional - fall back to NumPy
+    njit = None
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale vectors (rows) to unit length so cosine similarity is a dot product."""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, np.finfo(np.float32).tiny)
+
+
+if njit is not None:
+    # Explicit signature compiles (or loads from cache) at import, not on the first search
+    @njit("float32[:](float32[:, :], float32[:])", parallel=True, fastmath=True, cache=True)
+    def _dot_scores(embeddings, query):
+        """Dot product of every row with the query, vectorized and split across cores."""
+        scores = np.empty(embeddings.shape[0], dtype=np.float32)
+        for i in prange(embeddings.shape[0]):
+            total = np.float32(0.0)
+            for j in range(embeddings.shape[1]):
+                total += embeddings[i, j] * query[j]
+            scores[i] = total
+        return scores
+else:
+    def _dot_scores(embeddings, query):
+        """Dot product of every row with the query."""
+        return embeddings @ query
+
+
+def cosine_scores(embeddings, query) -> np.ndarray:
+    """Cosine similarity between each embedding and the query."""
+    embeddings = normalize(np.ascontiguousarray(embeddings, dtype=np.float32))
+    query = normalize(np.ascontiguousarray(query, dtype=np.float32))
+    return _dot_scores(embeddings, query)
+
+
+def rerank(query_embedding, embeddings, documents: list[str], top_k: int) -> list[str]:
+    """Return the top_k documents ordered by cosine similarity to the query."""
+    if len(documents) == 0:
+        return []
+    scores = cosine_scores(embeddings, query_embedding)
+    order = np.argsort(-scores, kind="stable")[:top_k]
+    return [documents[i] for i in order]
@@ -1,25 +1,102 @@
-import sqlite3
-from pydantic import BaseModel, field_validator
-from typing import Optional, Literal
-
-DB_PATH = "./db/sales.db"
+from dataclasses import dataclass
+import numpy as np
+from pydantic import BaseModel
+from typing import Optional, Literal, get_args
+from my_agent.tools.sales_db import get_connection
+
+# SQL expression for the period key of a sales row, and the number of periods in a year
+_PERIOD_EXPR = {'monthly': 'month', 'quarterly': '((month - 1) / 3 + 1)'}
+_PERIOD_COUNT = {'monthly': 12, 'quarterly': 4}
+
+# Result key for the period number, and display names for category_breakdown
+_PERIOD_LABEL = {'monthly': 'month', 'quarterly': 'quarter'}
+_MONTH_NAMES = ('', 'January', 'February', 'March', 'April', 'May', 'June',
+                'July', 'August', 'September', 'October', 'November', 'December')
+
+# Statements are kept as constants so sqlite3's statement cache reuses them
+_SQL_MONTHLY = """
+    SELECT month, SUM(amount) as total
+    FROM sales
+    WHERE year = ?
+    GROUP BY month
+    ORDER BY month
+"""
+
+_SQL_QUARTERLY = """
+    SELECT ((month - 1) / 3 + 1) as quarter, SUM(amount) as total
+    FROM sales
+    WHERE year = ?
+    GROUP BY quarter
+    ORDER BY quarter
+"""
+
+_SQL_CAT_MONTHLY = """
+    SELECT category, SUM(amount) as total
+    FROM sales
+    WHERE year = ? AND month = ?
+    GROUP BY category
+    ORDER BY total DESC
+"""
+
+_SQL_CAT_QUARTERLY = """
+    SELECT category, SUM(amount) as total
+    FROM sales
+    WHERE year = ? AND ((month - 1) / 3 + 1) = ?
+    GROUP BY category
+    ORDER BY total DESC
+"""
+
+_SQL_YOY = {
+    period: f"""
+    SELECT year, {expr} as period_key, SUM(amount) as total
+    FROM sales
+    WHERE year IN (?, ?)
+    GROUP BY year, period_key
+    ORDER BY year, period_key
+"""
+    for period, expr in _PERIOD_EXPR.items()
+}
 
 
 # Input Models
-class MetricsInput(BaseModel):
-    metric_type: Literal['forecast_comparison', 'yoy_comparison', 'growth', 'category_breakdown']
+MetricType = Literal['forecast_comparison', 'yoy_comparison', 'growth', 'category_breakdown']
+Period = Literal['monthly', 'quarterly']
+
+
+def _as_int(name: str, value) -> Optional[int]:
+    """Coerce an LLM-supplied value (int, "2025", 2025.0) to int."""
+    if value is None:
+        return None
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"{name} must be a whole number, got {value}")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer, got {value!r}") from None
+
+
+# Plain dataclass rather than a Pydantic model - validation runs on every tool call
+@dataclass(slots=True)
+class MetricsInput:
+    metric_type: MetricType
     year: int
-    period: Literal['monthly', 'quarterly'] = 'monthly'
+    period: Period = 'monthly'
     period_number: Optional[int] = None
     forecast_values: Optional[dict[int, float]] = None
     compare_year: Optional[int] = None
 
-    @field_validator('forecast_values', mode='before')
-    @classmethod
-    def convert_forecast_keys(cls, v):
-        if v is None:
-            return v
-        return {int(k): float(val) for k, val in v.items()}
+    def __post_init__(self):
+        if self.metric_type not in get_args(MetricType):
+            raise ValueError(f"Unknown metric_type: {self.metric_type}. Use one of: {', '.join(get_args(MetricType))}")
+        if self.period not in get_args(Period):
+            raise ValueError(f"Unknown period: {self.period}. Use one of: {', '.join(get_args(Period))}")
+        if self.year is None:
+            raise ValueError("year is required")
+        self.year = _as_int('year', self.year)
+        self.period_number = _as_int('period_number', self.period_number)
+        self.compare_year = _as_int('compare_year', self.compare_year)
+        if self.forecast_values is not None:
+            self.forecast_values = {int(k): float(val) for k, val in self.forecast_values.items()}
 
 
 # Output Models
@@ -191,41 +268,44 @@ def calculate_metrics(
         return {"status": "error", "message": str(e)}
 
 
-def _get_sales_by_period(year: int, period: str = 'monthly') -> dict:
-    """Get aggregated sales by period (month or quarter)."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+def _get_sales_by_period(year: int, period: str = 'monthly') -> np.ndarray:
+    """Get aggregated sales by period (month or quarter).
 
-    if period == 'quarterly':
-        cursor.execute("""
-            SELECT ((month - 1) / 3 + 1) as quarter, SUM(amount) as total
-            FROM sales
-            WHERE year = ?
-            GROUP BY quarter
-            ORDER BY quarter
-        """, (year,))
-    else:
-        cursor.execute("""
-            SELECT month, SUM(amount) as total
-            FROM sales
-            WHERE year = ?
-            GROUP BY month
-            ORDER BY month
-        """, (year,))
+    Returns a dense array indexed by period number (13 entries for monthly,
+    5 for quarterly; index 0 unused). Periods without sales are NaN.
+    """
+    cursor = get_connection().cursor()
+
+    cursor.execute(_SQL_QUARTERLY if period == 'quarterly' else _SQL_MONTHLY, (year,))
+    rows = cursor.fetchall()
+
+    # Rows are ordered by period, so the last one decides if a bad month needs more room
+    size = max(_PERIOD_COUNT[period], rows[-1][0] if rows else 0) + 1
+    totals = np.full(size, np.nan)
+    for p, total in rows:
+        totals[p] = total
+    return totals
 
-    results = {row[0]: row[1] for row in cursor.fetchall()}
-    conn.close()
-    return results
 
+def _periods_with_sales(totals: np.ndarray) -> list[int]:
+    """Period numbers that have sales, in order."""
+    return np.flatnonzero(~np.isnan(totals)).tolist()
 
-def _get_years_with_data() -> list[int]:
-    """Get list of years that have sales data."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT DISTINCT year FROM sales ORDER BY year")
-    years = [row[0] for row in cursor.fetchall()]
-    conn.close()
-    return years
+
+def _values_at(totals: np.ndarray, periods: list[int]) -> np.ndarray:
+    """Sales for each of the given periods, 0 for periods without sales."""
+    periods = np.asarray(periods, dtype=np.intp)
+    values = np.zeros(len(periods))
+    in_range = (periods >= 0) & (periods < len(totals))
+    values[in_range] = totals[periods[in_range]]
+    return np.nan_to_num(values, nan=0.0)
+
+
+def _pct(change: np.ndarray, base: np.ndarray, fill: float = 0.0) -> np.ndarray:
+    """Percentage change relative to base, or fill where base is zero."""
+    out = np.full_like(change, fill)
+    np.divide(change, base, out=out, where=base != 0)
+    return np.multiply(out, 100, out=out, where=base != 0)
 
 
 def _forecast_comparison(year: int, period: str, period_number: int, forecast_values: dict) -> dict:
@@ -234,43 +314,43 @@ def _forecast_comparison(year: int, period: str, period_number: int, forecast_va
         return {"status": "error", "message": "forecast_values is required for forecast_comparison"}
 
     actuals = _get_sales_by_period(year, period)
+    periods_with_sales = _periods_with_sales(actuals)
 
-    results = []
-    period_label = "quarter" if period == 'quarterly' else "month"
-
-    periods_to_check = [period_number] if period_number else sorted(set(actuals.keys()) | set(forecast_values.keys()))
+    period_label = _PERIOD_LABEL[period]
 
-    for p in periods_to_check:
-        # Keys are already converted to int by Pydantic validator
-        forecast = forecast_values.get(p, 0)
-        actual = actuals.get(p, 0)
-        variance = actual - forecast
-        variance_pct = (variance / forecast * 100) if forecast else 0
+    periods_to_check = [period_number] if period_number else sorted(set(periods_with_sales) | set(forecast_values.keys()))
 
-        if variance > 0:
-            status = "above_forecast"
-        elif variance < 0:
-            status = "below_forecast"
-        else:
-            status = "on_target"
+    # Keys are already converted to int by MetricsInput
+    forecast = np.array([forecast_values.get(p, 0) for p in periods_to_check], dtype=np.float64)
+    actual = _values_at(actuals, periods_to_check)
+    variance = actual - forecast
+    variance_pct = _pct(variance, forecast)
+    statuses = np.where(variance > 0, "above_forecast", np.where(variance < 0, "below_forecast", "on_target"))
 
-        results.append({
+    # round() per value, not np.round - it isn't correctly rounded for values like x.xx5
+    results = [
+        {
             period_label: p,
-            "actual": round(actual, 2),
-            "forecast": round(forecast, 2),
-            "variance": round(variance, 2),
-            "variance_pct": round(variance_pct, 2),
+            "actual": round(a, 2),
+            "forecast": round(f, 2),
+            "variance": round(v, 2),
+            "variance_pct": round(v_pct, 2),
             "status": status
-        })
+        }
+        for p, a, f, v, v_pct, status in zip(
+            periods_to_check, actual.tolist(), forecast.tolist(), variance.tolist(),
+            variance_pct.tolist(), statuses.tolist()
+        )
+    ]
 
-    total_actual = sum(r["actual"] for r in results)
-    total_forecast = sum(r["forecast"] for r in results)
+    # Totals from the unrounded values; only the summary is rounded
+    total_actual = float(actual.sum())
+    total_forecast = float(forecast.sum())
     total_variance = total_actual - total_forecast
     total_variance_pct = (total_variance / total_forecast * 100) if total_forecast else 0
 
-    # Get data availability metadata
-    available_years = _get_years_with_data()
-    has_data = year in available_years
+    # Data availability comes from the same query - a year with sales has periods
+    has_data = bool(periods_with_sales)
 
     return {
         "status": "success",
@@ -294,35 +374,46 @@ def _yoy_comparison(year: int, period: str, period_number: int, compare_year: in
     if not compare_year:
         return {"status": "error", "message": "compare_year is required for yoy_comparison"}
 
-    current = _get_sales_by_period(year, period)
-    previous = _get_sales_by_period(compare_year, period)
+    # Both years in one query, split by year in a single pass
+    cursor = get_connection().cursor()
+    cursor.execute(_SQL_YOY[period], (year, compare_year))
+
+    current, previous = {}, {}
+    total_current = total_previous = 0
+    available_years = set()
+    for row_year, p, total in cursor.fetchall():
+        available_years.add(row_year)
+        if row_year == year:
+            current[p] = total
+            total_current += total
+        if row_year == compare_year:
+            previous[p] = total
+            total_previous += total
 
     results = []
-    period_label = "quarter" if period == 'quarterly' else "month"
+    period_label = _PERIOD_LABEL[period]
 
     periods_to_check = [period_number] if period_number else sorted(set(current.keys()) | set(previous.keys()))
 
-    for p in periods_to_check:
-        curr_val = current.get(p, 0)
-        prev_val = previous.get(p, 0)
-        change = curr_val - prev_val
-        change_pct = (change / prev_val * 100) if prev_val else 0
+    curr_vals = np.array([current.get(p, 0) for p in periods_to_check], dtype=np.float64)
+    prev_vals = np.array([previous.get(p, 0) for p in periods_to_check], dtype=np.float64)
+    change = curr_vals - prev_vals
+    change_pct = _pct(change, prev_vals)
 
+    for p, curr_val, prev_val, c, c_pct in zip(
+        periods_to_check, curr_vals.tolist(), prev_vals.tolist(), change.tolist(), change_pct.tolist()
+    ):
         results.append({
             period_label: p,
             f"year_{year}": round(curr_val, 2),
             f"year_{compare_year}": round(prev_val, 2),
-            "change": round(change, 2),
-            "change_pct": round(change_pct, 2)
+            "change": round(c, 2),
+            "change_pct": round(c_pct, 2)
         })
 
-    total_current = sum(current.values())
-    total_previous = sum(previous.values())
     total_change = total_current - total_previous
     total_change_pct = (total_change / total_previous * 100) if total_previous else 0
 
-    # Get data availability metadata
-    available_years = _get_years_with_data()
     years_requested = [year, compare_year]
     missing = [y for y in years_requested if y not in available_years]
 
@@ -349,33 +440,33 @@ def _growth(year: int, period: str, period_number: int) -> dict:
     sales = _get_sales_by_period(year, period)
 
     results = []
-    period_label = "quarter" if period == 'quarterly' else "month"
-    sorted_periods = sorted(sales.keys())
+    period_label = _PERIOD_LABEL[period]
+    sorted_periods = _periods_with_sales(sales)
 
     periods_to_report = [period_number] if period_number else sorted_periods
 
-    for i, p in enumerate(sorted_periods):
+    # Each period is compared with the one before it; the first has no previous
+    current = sales[sorted_periods]
+    previous = np.full_like(current, np.nan)
+    previous[1:] = current[:-1]
+    growth_pct = _pct(current - previous, np.nan_to_num(previous), fill=np.nan)
+
+    for p, curr, prev, growth in zip(sorted_periods, current.tolist(), previous.tolist(), growth_pct.tolist()):
         if p not in periods_to_report:
             continue
 
-        current = sales[p]
-        previous = sales.get(sorted_periods[i - 1]) if i > 0 else None
-        growth_pct = ((current - previous) / previous * 100) if previous else None
-
         results.append({
             period_label: p,
-            "current": round(current, 2),
-            "previous": round(previous, 2) if previous is not None else None,
-            "growth_pct": round(growth_pct, 2) if growth_pct is not None else None
+            "current": round(curr, 2),
+            "previous": None if np.isnan(prev) else round(prev, 2),
+            "growth_pct": None if np.isnan(growth) else round(growth, 2)
         })
 
     # Calculate average growth rate (excluding first period)
     growth_rates = [r["growth_pct"] for r in results if r["growth_pct"] is not None]
     avg_growth = sum(growth_rates) / len(growth_rates) if growth_rates else None
 
-    # Get data availability metadata
-    available_years = _get_years_with_data()
-    has_data = year in available_years
+    has_data = bool(sorted_periods)
 
     return {
         "status": "success",
@@ -396,47 +487,31 @@ def _category_breakdown(year: int, period: str, period_number: int) -> dict:
     if not period_number:
         return {"status": "error", "message": "period_number is required for category_breakdown"}
 
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    cursor = get_connection().cursor()
 
     if period == 'quarterly':
-        cursor.execute("""
-            SELECT category, SUM(amount) as total
-            FROM sales
-            WHERE year = ? AND ((month - 1) / 3 + 1) = ?
-            GROUP BY category
-            ORDER BY total DESC
-        """, (year, period_number))
+        cursor.execute(_SQL_CAT_QUARTERLY, (year, period_number))
         period_label = f"Q{period_number}"
     else:
-        cursor.execute("""
-            SELECT category, SUM(amount) as total
-            FROM sales
-            WHERE year = ? AND month = ?
-            GROUP BY category
-            ORDER BY total DESC
-        """, (year, period_number))
-        month_names = ['', 'January', 'February', 'March', 'April', 'May', 'June',
-                       'July', 'August', 'September', 'October', 'November', 'December']
-        period_label = month_names[period_number] if 1 <= period_number <= 12 else f"Month {period_number}"
+        cursor.execute(_SQL_CAT_MONTHLY, (year, period_number))
+        period_label = _MONTH_NAMES[period_number] if 1 <= period_number <= 12 else f"Month {period_number}"
 
     rows = cursor.fetchall()
-    conn.close()
 
     total = sum(row[1] for row in rows)
 
+    amounts = np.array([row[1] for row in rows], dtype=np.float64)
+    pcts = _pct(amounts, np.full_like(amounts, total))
+
     results = []
-    for category, amount in rows:
-        pct = (amount / total * 100) if total else 0
+    for (category, amount), pct in zip(rows, pcts.tolist()):
         results.append({
             "category": category,
             "amount": round(amount, 2),
             "percentage_of_total": round(pct, 2)
         })
 
-    # Get data availability metadata
-    available_years = _get_years_with_data()
-    has_data = year in available_years and len(rows) > 0
+    has_data = len(rows) > 0
 
     return {
         "status": "success",
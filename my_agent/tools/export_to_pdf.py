@@ -1,14 +1,26 @@
 """PDF export tool for the agent."""
 
+import copy
+import functools
+import io
 import re
 from datetime import datetime
 from pathlib import Path
 
+from fontTools import ttLib
 from fpdf import FPDF
+from fpdf.fonts import FontFace, SubsetMap
 
 
 EXPORTS_DIR = Path(__file__).parent.parent.parent / "exports"
 FONTS_DIR = Path(__file__).parent.parent.parent / "fonts"
+FONT_FILES = {"": "DejaVuSans.ttf", "B": "DejaVuSans-Bold.ttf"}  # DejaVu style -> file
+TABLE_CELL_FALLBACK_CHARS = 30  # Cell length used when a table row is too tall for one page
+
+# A run of consecutive lines that contain a pipe character (markdown table)
+_TABLE_BLOCK_RE = re.compile(r"^[^\n|]*\|[^\n]*(?:\n[^\n|]*\|[^\n]*)*", re.MULTILINE)
+# Separator row such as |---|:---:|
+_SEP_RE = re.compile(r"^\|[-:\s|]+\|$")
 
 
 def export_to_pdf(content: str, title: str = "Sales Report") -> dict:
@@ -28,37 +40,13 @@ def export_to_pdf(content: str, title: str = "Sales Report") -> dict:
     try:
         EXPORTS_DIR.mkdir(exist_ok=True)
 
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_auto_page_break(auto=True, margin=15)
-
-        # Register DejaVu fonts for Unicode support
-        pdf.add_font("DejaVu", "", str(FONTS_DIR / "DejaVuSans.ttf"))
-        pdf.add_font("DejaVu", "B", str(FONTS_DIR / "DejaVuSans-Bold.ttf"))
-
-        # Header with title
-        pdf.set_font("DejaVu", "B", 16)
-        pdf.cell(0, 10, title, ln=True, align="C")
-
-        # Timestamp
-        pdf.set_font("DejaVu", "", 10)
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        pdf.cell(0, 8, f"Generated: {timestamp}", ln=True, align="C")
-
-        # Separator line
-        pdf.ln(5)
-        pdf.set_draw_color(200, 200, 200)
-        pdf.line(10, pdf.get_y(), 200, pdf.get_y())
-        pdf.ln(10)
-
-        # Render content with table support
-        _render_content(pdf, content)
+        pdf_bytes = render_pdf(content, title)
 
         # Save PDF
         filename = f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
         filepath = EXPORTS_DIR / filename
 
-        pdf.output(str(filepath))
+        filepath.write_bytes(pdf_bytes)
 
         return {
             "status": "success",
@@ -73,14 +61,77 @@ def export_to_pdf(content: str, title: str = "Sales Report") -> dict:
         }
 
 
-def _render_content(pdf: FPDF, content: str) -> None:
+def render_pdf(content: str, title: str = "Sales Report") -> bytes:
+    """Render report content to PDF bytes in memory, without touching disk."""
+    try:
+        return _build_pdf(content, title)
+    except ValueError:
+        # fpdf2 can't split a table row across pages - shorten the cells and start over
+        return _build_pdf(content, title, max_cell_chars=TABLE_CELL_FALLBACK_CHARS)
+
+
+def _build_pdf(content: str, title: str, max_cell_chars: int | None = None) -> bytes:
+    """Lay out the report, truncating table cells to max_cell_chars if given."""
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=True, margin=15)
+
+    # Register DejaVu fonts for Unicode support
+    _add_fonts(pdf)
+
+    # Header with title
+    pdf.set_font("DejaVu", "B", 16)
+    pdf.cell(0, 10, title, ln=True, align="C")
+
+    # Timestamp
+    pdf.set_font("DejaVu", "", 10)
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    pdf.cell(0, 8, f"Generated: {timestamp}", ln=True, align="C")
+
+    # Separator line
+    pdf.ln(5)
+    pdf.set_draw_color(200, 200, 200)
+    pdf.line(10, pdf.get_y(), 200, pdf.get_y())
+    pdf.ln(10)
+
+    # Render content with table support
+    _render_content(pdf, content, max_cell_chars)
+
+    return bytes(pdf.output())
+
+
+@functools.cache
+def _font_prototypes() -> dict:
+    """Parse the DejaVu fonts once. Returns {fontkey: (parsed font, file bytes)}."""
+    pdf = FPDF()
+    for style, filename in FONT_FILES.items():
+        pdf.add_font("DejaVu", style, str(FONTS_DIR / filename))
+    return {
+        f"dejavu{style}": (pdf.fonts[f"dejavu{style}"], (FONTS_DIR / filename).read_bytes())
+        for style, filename in FONT_FILES.items()
+    }
+
+
+def _add_fonts(pdf: FPDF) -> None:
+    """Register the DejaVu fonts on a new document without re-parsing them."""
+    for fontkey, (prototype, font_bytes) in _font_prototypes().items():
+        font = copy.copy(prototype)
+        # Metrics are shared; the glyph subset and the TTFont (which output()
+        # subsets in place) must be per document
+        font.ttfont = ttLib.TTFont(io.BytesIO(font_bytes), recalcTimestamp=False, lazy=True)
+        font.missing_glyphs = []
+        font.subset = SubsetMap(font)
+        pdf.fonts[fontkey] = font
+
+
+def _render_content(pdf: FPDF, content: str, max_cell_chars: int | None = None) -> None:
     """Render content to PDF, handling markdown tables."""
     # Split content into sections (table vs non-table)
     sections = _split_into_sections(content)
 
     for section_type, section_content in sections:
         if section_type == "table":
-            _render_table(pdf, section_content)
+            _render_table(pdf, section_content, max_cell_chars)
         else:
             _render_text(pdf, section_content)
 
@@ -88,55 +139,24 @@ def _render_content(pdf: FPDF, content: str) -> None:
 def _split_into_sections(content: str) -> list[tuple[str, str]]:
     """Split content into table and text sections."""
     sections = []
-    lines = content.split("\n")
-    current_section = []
-    in_table = False
+    position = 0
 
-    for line in lines:
-        is_table_line = _is_table_line(line)
-
-        if is_table_line and not in_table:
-            # Starting a table - save any accumulated text
-            if current_section:
-                text = "\n".join(current_section).strip()
-                if text:
-                    sections.append(("text", text))
-                current_section = []
-            in_table = True
-            current_section.append(line)
-        elif is_table_line and in_table:
-            # Continuing a table
-            current_section.append(line)
-        elif not is_table_line and in_table:
-            # Ending a table - save it
-            if current_section:
-                sections.append(("table", "\n".join(current_section)))
-                current_section = []
-            in_table = False
-            current_section.append(line)
-        else:
-            # Regular text
-            current_section.append(line)
+    # Each match is a run of consecutive table lines; the gaps are text
+    for match in _TABLE_BLOCK_RE.finditer(content):
+        text = content[position:match.start()].strip()
+        if text:
+            sections.append(("text", text))
+        sections.append(("table", match.group()))
+        position = match.end()
 
-    # Don't forget the last section
-    if current_section:
-        content_str = "\n".join(current_section).strip()
-        if content_str:
-            section_type = "table" if in_table else "text"
-            sections.append((section_type, content_str))
+    # Don't forget the text after the last table
+    text = content[position:].strip()
+    if text:
+        sections.append(("text", text))
 
     return sections
 
 
-def _is_table_line(line: str) -> bool:
-    """Check if a line is part of a markdown table."""
-    stripped = line.strip()
-    if not stripped:
-        return False
-    # Table lines start and contain pipe characters
-    return "|" in stripped
-
-
 def _render_text(pdf: FPDF, text: str) -> None:
     """Render plain text to PDF."""
     if not text.strip():
@@ -146,7 +166,7 @@ def _render_text(pdf: FPDF, text: str) -> None:
     pdf.ln(2)
 
 
-def _render_table(pdf: FPDF, table_text: str) -> None:
+def _render_table(pdf: FPDF, table_text: str, max_cell_chars: int | None = None) -> None:
     """Render a markdown table to PDF."""
     lines = [l.strip() for l in table_text.split("\n") if l.strip()]
 
@@ -157,7 +177,7 @@ def _render_table(pdf: FPDF, table_text: str) -> None:
     rows = []
     for line in lines:
         # Skip separator lines (|---|---|)
-        if re.match(r"^\|[-:\s|]+\|$", line):
+        if _SEP_RE.match(line):
             continue
         # Parse cells
         cells = [c.strip() for c in line.split("|")]
@@ -166,51 +186,31 @@ def _render_table(pdf: FPDF, table_text: str) -> None:
             cells = cells[1:]
         if cells and cells[-1] == "":
             cells = cells[:-1]
+        if max_cell_chars is not None:
+            cells = [c if len(c) <= max_cell_chars else c[:max_cell_chars - 1] + "…" for c in cells]
         if cells:
             rows.append(cells)
 
     if not rows:
         return
 
-    # Calculate column widths
     num_cols = max(len(row) for row in rows)
-    page_width = pdf.w - 20  # 10mm margins on each side
-    col_width = page_width / num_cols
 
     pdf.set_font("DejaVu", "", 10)
     pdf.ln(3)
 
-    for i, row in enumerate(rows):
-        # Pad row to have consistent column count
-        while len(row) < num_cols:
-            row.append("")
-
-        # First row is header - make it bold
-        if i == 0:
-            pdf.set_font("DejaVu", "B", 10)
-            pdf.set_fill_color(240, 240, 240)
-            fill = True
-        else:
-            pdf.set_font("DejaVu", "", 10)
-            fill = False
-
-        # Calculate row height based on content
-        row_height = 7
-
-        for cell in row:
-            x = pdf.get_x()
-            y = pdf.get_y()
-            # Draw cell border
-            pdf.rect(x, y, col_width, row_height)
-            if fill:
-                pdf.set_xy(x, y)
-                pdf.cell(col_width, row_height, "", fill=True)
-                pdf.set_xy(x, y)
-            # Add cell text with small padding
-            pdf.set_xy(x + 1, y + 1)
-            pdf.cell(col_width - 2, row_height - 2, cell[:30], align="L")  # Truncate long text
-            pdf.set_xy(x + col_width, y)
-
-        pdf.ln(row_height)
+    # First row is the header - bold on a light grey background; long cells wrap
+    with pdf.table(
+        borders_layout="ALL",
+        headings_style=FontFace(emphasis="BOLD", fill_color=(240, 240, 240)),
+        text_align="LEFT",
+        min_row_height=7,
+        padding=1
+    ) as table:
+        for row in rows:
+            # Pad row to have consistent column count
+            while len(row) < num_cols:
+                row.append("")
+            table.row(row)
 
     pdf.ln(5)
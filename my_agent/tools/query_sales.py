@@ -1,6 +1,11 @@
+import re
 import sqlite3
+from typing import Iterator
+from my_agent.tools.sales_db import get_connection
 
-DB_PATH = "./db/sales.db"
+FETCH_BATCH_SIZE = 1000  # Rows per fetchmany() when streaming results
+
+_SELECT_RE = re.compile(r"^\s*SELECT\b", re.IGNORECASE)
 
 
 def query_sales(query: str) -> dict:
@@ -30,23 +35,19 @@ def query_sales(query: str) -> dict:
         - "SELECT * FROM sales ORDER BY amount DESC LIMIT 5"
     """
     try:
-        # Security: Only allow SELECT statements
-        normalized = query.strip().upper()
-        if not normalized.startswith("SELECT"):
+        # Security: Only allow SELECT statements (sqlite3 itself refuses to
+        # execute more than one statement per call)
+        if not _SELECT_RE.match(query):
             return {
                 "status": "error",
                 "message": "Only SELECT queries are allowed"
             }
 
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute(query)
+        cursor = get_connection().execute(query)
 
         columns = [description[0] for description in cursor.description]
         results = cursor.fetchall()
 
-        conn.close()
-
         return {
             "status": "success",
             "columns": columns,
@@ -54,3 +55,25 @@ def query_sales(query: str) -> dict:
         }
     except Exception as e:
         return {"status": "error", "message": str(e)}
+
+
+def iter_query_sales(query: str, batch_size: int = FETCH_BATCH_SIZE) -> Iterator[list[tuple]]:
+    """Run a SELECT query and return an iterator over its rows in batches of up to batch_size.
+
+    Library API for Python callers that handle large results without holding
+    them all in memory - it is not registered as an agent tool (the agent uses
+    query_sales). The query is checked and executed immediately, so a rejected
+    or invalid query raises here rather than on the first iteration.
+    """
+    if not _SELECT_RE.match(query):
+        raise ValueError("Only SELECT queries are allowed")
+
+    cursor = get_connection().execute(query)
+    cursor.arraysize = batch_size
+    return _iter_batches(cursor)
+
+
+def _iter_batches(cursor: sqlite3.Cursor) -> Iterator[list[tuple]]:
+    """Yield the cursor's remaining rows, cursor.arraysize at a time."""
+    while rows := cursor.fetchmany():
+        yield rows
@@ -0,0 +1,112 @@
+"""Shared connection to the sales database used by the SQL tools."""
+
+import atexit
+import os
+import sqlite3
+import threading
+import weakref
+
+DB_PATH = "./db/sales.db"
+
+# Applied once per connection: WAL reads without journal setup, larger page cache,
+# in-memory temp tables and memory-mapped I/O
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA mmap_size=268435456",
+)
+
+# Covering indexes (name -> columns) so the metrics aggregations are index-only scans
+_INDEXES = {
+    "idx_sales_ym_amt": "year, month, amount",
+    "idx_sales_ymc_amt": "year, month, category, amount",
+    # Quarter expression index; month and category are included so it also covers
+    "idx_sales_yq_amt": "year, ((month - 1) / 3 + 1), month, category, amount",
+}
+
+_LOCAL = threading.local()
+
+
+class _Connection(sqlite3.Connection):
+    """sqlite3.Connection that can be weakly referenced."""
+
+
+# Open connections, closed at exit; a thread's connection drops out when the thread ends
+_LIVE: weakref.WeakSet = weakref.WeakSet()
+
+
+def _ensure_indexes(conn: sqlite3.Connection) -> None:
+    """Create the covering indexes, and gather planner statistics for new ones."""
+    try:
+        for name, columns in _INDEXES.items():
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON sales({columns})")
+        if not _has_index_stats(conn):
+            conn.execute("ANALYZE sales")
+    except sqlite3.OperationalError:
+        pass  # Read-only database - queries still work, just without the indexes
+
+
+def _has_index_stats(conn: sqlite3.Connection) -> bool:
+    """Check whether ANALYZE has already recorded statistics for every index."""
+    placeholders = ",".join("?" * len(_INDEXES))
+    try:
+        (count,) = conn.execute(
+            f"SELECT COUNT(DISTINCT idx) FROM sqlite_stat1 WHERE idx IN ({placeholders})",
+            tuple(_INDEXES)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return False  # sqlite_stat1 doesn't exist until the first ANALYZE
+    return count == len(_INDEXES)
+
+
+def _close(conn: sqlite3.Connection) -> None:
+    """Let SQLite refresh planner statistics, then close the connection."""
+    _LIVE.discard(conn)
+    try:
+        conn.execute("PRAGMA optimize")
+    except sqlite3.Error:
+        pass  # Statistics are only a hint - still close the connection
+    conn.close()
+
+
+@atexit.register
+def _close_all() -> None:
+    """Close every connection that is still open."""
+    for conn in list(_LIVE):
+        _close(conn)
+
+
+def _file_id() -> tuple | None:
+    """Identity of the database file, which changes when it is deleted and recreated."""
+    try:
+        stat = os.stat(DB_PATH)
+    except FileNotFoundError:
+        return None
+    return stat.st_dev, stat.st_ino
+
+
+def get_connection() -> sqlite3.Connection:
+    """Return this thread's sales database connection, opening it on first use.
+
+    The connection is reopened when the database file has been replaced
+    (e.g. by db/init_db.py), so it never keeps reading a deleted file.
+    """
+    conn = getattr(_LOCAL, "conn", None)
+    if conn is not None and _LOCAL.file_id != _file_id():
+        _LOCAL.conn = None
+        _close(conn)
+        conn = None
+    if conn is None:
+        conn = sqlite3.connect(
+            DB_PATH, check_same_thread=False, isolation_level=None, cached_statements=256, factory=_Connection
+        )
+        for pragma in _PRAGMAS:
+            conn.execute(pragma)
+        _ensure_indexes(conn)
+        _LOCAL.conn = conn
+        _LOCAL.file_id = _file_id()
+        _LIVE.add(conn)
+    return conn
+
@@ -1,9 +1,26 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
 import requests
-import chromadb
+from vector_store import get_vector_store
 
 OLLAMA_API_BASE = "http://localhost:11434"
 EMBEDDING_MODEL = "granite-embedding:30m"
-CHROMA_DB_PATH = "./chromadb_storage"
+# Stored vectors are unit length, so the store's own order is already cosine order.
+# Only collections indexed before normalization need reranking.
+RERANK_LEGACY_VECTORS = os.getenv("RERANK_LEGACY_VECTORS", "").lower() in ("1", "true", "yes")
+RERANK_CANDIDATES = 3 if RERANK_LEGACY_VECTORS else 1  # Fetch this many times n_results from the vector store
+QUERY_CACHE_SIZE = 512  # Recent query embeddings kept in memory
+
+# Reused across searches so the connection to Ollama stays open (keep-alive)
+_SESSION = requests.Session()
+
+# LRU of query hash -> float32 embedding bytes, so repeated queries skip Ollama
+_QUERY_CACHE: OrderedDict[str, bytes] = OrderedDict()
+_QUERY_CACHE_LOCK = threading.Lock()
 
 
 def search_documents(query: str, n_results: int = 3) -> dict:
@@ -16,29 +33,98 @@ def search_documents(query: str, n_results: int = 3) -> dict:
     Returns:
         dict: Contains 'status' and 'chunks' (list of relevant text).
     """
+    return search_documents_batch([query], n_results)
+
+
+def search_documents_batch(queries: list[str], n_results: int = 3) -> dict:
+    """Search for several queries with one embedding request and one store query.
+
+    Not registered as an agent tool, so search_documents keeps a plain string
+    parameter in its tool schema. Results for all queries are merged into one
+    de-duplicated 'chunks' list, n_results per query.
+    """
     try:
-        # Get embedding for the query
-        response = requests.post(
-            f"{OLLAMA_API_BASE}/api/embeddings",
-            json={"model": EMBEDDING_MODEL, "prompt": query}
-        )
-        response.raise_for_status()
-        query_embedding = response.json()["embedding"]
+        if not queries:
+            return {"status": "success", "chunks": []}
 
-        # Search ChromaDB
-        client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
-        collection = client.get_or_create_collection(name="documents")
+        # Get embeddings for all queries in one request
+        query_embeddings = _embed_queries(queries)
 
-        results = collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results
+        # Search the vector database for all queries in one call
+        results = get_vector_store().query(
+            query_embeddings=query_embeddings,
+            n_results=n_results * RERANK_CANDIDATES,
+            include_embeddings=RERANK_LEGACY_VECTORS
         )
 
+        chunks = []
         if results and results['documents']:
-            return {
-                "status": "success",
-                "chunks": results['documents'][0]
-            }
-        return {"status": "success", "chunks": []}
+            if RERANK_LEGACY_VECTORS:
+                # Imported here so Numba is only loaded when reranking is on
+                from my_agent.rerank import rerank
+                ranked = [
+                    # Rerank the candidates by cosine similarity and keep the best n_results
+                    rerank(query_embedding, embeddings, documents, n_results)
+                    for query_embedding, embeddings, documents in zip(
+                        query_embeddings, results['embeddings'], results['documents']
+                    )
+                ]
+            else:
+                ranked = results['documents']
+            for documents in ranked:
+                for chunk in documents:
+                    if chunk not in chunks:
+                        chunks.append(chunk)
+        return {
+            "status": "success",
+            "chunks": chunks
+        }
     except Exception as e:
         return {"status": "error", "message": str(e)}
+
+
+def _embed_queries(queries: list[str]) -> list[np.ndarray]:
+    """Embed queries, serving repeats from the cache and fetching the rest in one request."""
+    keys = [
+        hashlib.blake2b(f"{EMBEDDING_MODEL}\0{query}".encode(), digest_size=16).hexdigest()
+        for query in queries
+    ]
+
+    found = {}
+    with _QUERY_CACHE_LOCK:
+        for key in keys:
+            if key in _QUERY_CACHE:
+                _QUERY_CACHE.move_to_end(key)
+                found[key] = _QUERY_CACHE[key]
+
+    missing = {key: query for key, query in zip(keys, queries) if key not in found}
+    if missing:
+        embeddings = _request_embeddings(list(missing.values()))
+        with _QUERY_CACHE_LOCK:
+            for key, embedding in zip(missing, embeddings):
+                found[key] = _QUERY_CACHE[key] = np.asarray(embedding, dtype=np.float32).tobytes()
+            while len(_QUERY_CACHE) > QUERY_CACHE_SIZE:
+                _QUERY_CACHE.popitem(last=False)
+
+    return [np.frombuffer(found[key], dtype=np.float32) for key in keys]
+
+
+def _request_embeddings(queries: list[str]) -> list[list[float]]:
+    """Embed queries with one request to Ollama's /api/embed."""
+    response = _SESSION.post(
+        f"{OLLAMA_API_BASE}/api/embed",
+        json={"model": EMBEDDING_MODEL, "input": queries}
+    )
+    # Older Ollama versions don't have /api/embed - fall back to one request per query
+    if response.status_code == 404:
+        embeddings = []
+        for query in queries:
+            response = _SESSION.post(
+                f"{OLLAMA_API_BASE}/api/embeddings",
+                json={"model": EMBEDDING_MODEL, "prompt": query}
+            )
+            response.raise_for_status()
+            embeddings.append(response.json()["embedding"])
+        return embeddings
+    response.raise_for_status()
+    return response.json()["embeddings"]
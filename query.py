@@ -1,29 +1,48 @@
 import asyncio
+import functools
 
 from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 from google.genai import types
-from my_agent.agent import root_agent
+from my_agent.agent import get_root_agent
 
+APP_NAME = "naive_rag"
 
-async def generate_answer(question: str) -> str:
+# One conversation session per user, reused across questions
+_SESSION_IDS: dict[str, str] = {}
+
+
+@functools.cache
+def get_runner() -> Runner:
+    """Build the runner and its in-memory session service once and reuse them."""
+    return Runner(
+        agent=get_root_agent(),
+        app_name=APP_NAME,
+        session_service=InMemorySessionService()
+    )
+
+
+async def _get_session_id(runner: Runner, user_id: str) -> str:
+    """Return the user's session id, creating the session on their first question."""
+    if user_id not in _SESSION_IDS:
+        session = await runner.session_service.create_session(
+            app_name=APP_NAME,
+            user_id=user_id
+        )
+        _SESSION_IDS[user_id] = session.id
+    return _SESSION_IDS[user_id]
+
+
+async def generate_answer(question: str, user_id: str = "user") -> str:
     """Generate answer using Google ADK agent (agent will search as needed)"""
     try:
-        session_service = InMemorySessionService()
-        runner = Runner(
-            agent=root_agent,
-            app_name="naive_rag",
-            session_service=session_service
-        )
-        session = await session_service.create_session(
-            app_name="naive_rag",
-            user_id="user"
-        )
+        runner = get_runner()
+        session_id = await _get_session_id(runner, user_id)
 
         final_response = ""
         async for event in runner.run_async(
-            user_id="user",
-            session_id=session.id,
+            user_id=user_id,
+            session_id=session_id,
             new_message=types.UserContent(question)
         ):
             # Only capture the final response, skip thinking/intermediate events
@@ -42,10 +61,10 @@ async def generate_answer(question: str) -> str:
         return f"Error generating answer: {e}"
 
 
-async def ask_question(question: str) -> str:
+async def ask_question(question: str, user_id: str = "user") -> str:
     """Main RAG pipeline - agent handles search via tool"""
     print("  → Sending question to agent...")
-    answer = await generate_answer(question)
+    answer = await generate_answer(question, user_id)
     return answer
 
 
@@ -0,0 +1,185 @@
+"""Vector storage backends for document chunks.
+
+ChromaDB is the default. For large corpora set VECTOR_BACKEND=faiss to keep
+vectors in a memory-mapped FAISS index, with chunk text and ids in a small
+SQLite table beside it.
+"""
+
+import abc
+import functools
+import json
+import os
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+
+# Configuration
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")  # "chroma" or "faiss"
+CHROMA_DB_PATH = "./chromadb_storage"
+CHROMA_ADD_BATCH_SIZE = 5000  # Rows per collection.add call
+FAISS_STORAGE_PATH = "./faiss_storage"
+COLLECTION_NAME = "documents"
+
+
+class VectorStore(abc.ABC):
+    """Interface shared by the storage backends."""
+
+    @abc.abstractmethod
+    def add(self, ids: list[str], embeddings: np.ndarray, documents: list[str], metadatas: list[dict]) -> None:
+        """Add chunks to the store. Ids that already exist are skipped."""
+
+    def persist(self) -> None:
+        """Make everything added so far durable."""
+
+    @abc.abstractmethod
+    def query(self, query_embeddings: list, n_results: int, include_embeddings: bool = False) -> dict:
+        """Find the nearest chunks for each query embedding.
+
+        Returns a dict with 'ids' and 'documents' (plus 'embeddings' if
+        include_embeddings is set), each holding one list per query
+        embedding, nearest first.
+        """
+
+
+class ChromaVectorStore(VectorStore):
+    """Chunks stored in a persistent ChromaDB collection."""
+
+    def __init__(self, path: str = CHROMA_DB_PATH):
+        import chromadb  # Heavy import - only pay for it when the store is opened
+
+        client = chromadb.PersistentClient(path=path)
+        self.collection = client.get_or_create_collection(name=COLLECTION_NAME)
+
+    def add(self, ids, embeddings, documents, metadatas):
+        # Add in batches (ChromaDB rejects very large single adds)
+        for start in range(0, len(ids), CHROMA_ADD_BATCH_SIZE):
+            end = start + CHROMA_ADD_BATCH_SIZE
+            self.collection.add(
+                embeddings=embeddings[start:end],
+                documents=documents[start:end],
+                ids=ids[start:end],
+                metadatas=metadatas[start:end]
+            )
+
+    def query(self, query_embeddings, n_results, include_embeddings=False):
+        results = self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            include=["documents", "embeddings"] if include_embeddings else ["documents"]
+        )
+        found = {"ids": results["ids"], "documents": results["documents"]}
+        if include_embeddings:
+            found["embeddings"] = results["embeddings"]
+        return found
+
+
+class FaissVectorStore(VectorStore):
+    """Chunks stored in a FAISS HNSW index, memory-mapped for queries.
+
+    Vectors are normalized at indexing time, so inner product equals cosine
+    similarity. The index file is rewritten on persist(); SQLite maps FAISS
+    row ids to chunk ids, source documents and text.
+    """
+
+    def __init__(self, path: str = FAISS_STORAGE_PATH):
+        import faiss  # Optional dependency - only needed for this backend
+
+        self.faiss = faiss
+        Path(path).mkdir(parents=True, exist_ok=True)
+        self.index_path = Path(path) / "index.faiss"
+        self.db = sqlite3.connect(Path(path) / "chunks.db", check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY,
+                chunk_id TEXT UNIQUE NOT NULL,
+                source TEXT,
+                document TEXT NOT NULL,
+                metadata TEXT
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks(source)")
+        self.db.commit()
+        self.index = None
+        self.index_mtime = None
+        self.writable = False
+
+    def _load_index(self, writable: bool):
+        """(Re)load the index - memory-mapped for reads, fully in memory for writes."""
+        if not self.index_path.exists():
+            return
+        mtime = self.index_path.stat().st_mtime_ns
+        if self.index is not None and mtime == self.index_mtime and (self.writable or not writable):
+            return
+        # IO_FLAG_MMAP only maps some index types; IO_FLAG_MMAP_IFC also maps
+        # the HNSW/IDMap storage. Older faiss without it reads the index into memory.
+        mmap_flag = getattr(self.faiss, "IO_FLAG_MMAP_IFC", self.faiss.IO_FLAG_MMAP)
+        flags = 0 if writable else mmap_flag
+        self.index = self.faiss.read_index(str(self.index_path), flags)
+        self.index_mtime = mtime
+        self.writable = writable
+
+    def add(self, ids, embeddings, documents, metadatas):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        self._load_index(writable=True)
+        if self.index is None:
+            hnsw = self.faiss.IndexHNSWFlat(embeddings.shape[1], 32, self.faiss.METRIC_INNER_PRODUCT)
+            self.index = self.faiss.IndexIDMap2(hnsw)
+            self.writable = True
+
+        # Rows stay uncommitted until persist() has written the index
+        new_rows, row_ids = [], []
+        for i, (chunk_id, document, metadata) in enumerate(zip(ids, documents, metadatas)):
+            cursor = self.db.execute(
+                "INSERT OR IGNORE INTO chunks (chunk_id, source, document, metadata) VALUES (?, ?, ?, ?)",
+                (chunk_id, metadata.get("source"), document, json.dumps(metadata))
+            )
+            if cursor.rowcount:
+                new_rows.append(i)
+                row_ids.append(cursor.lastrowid)
+
+        if new_rows:
+            self.index.add_with_ids(embeddings[new_rows], np.asarray(row_ids, dtype=np.int64))
+
+    def persist(self):
+        if self.index is not None and self.writable:
+            # Write a new file and swap it in - truncating the old one in place
+            # would pull the pages out from under a reader that has it mapped
+            tmp_path = self.index_path.with_suffix(".tmp")
+            self.faiss.write_index(self.index, str(tmp_path))
+            os.replace(tmp_path, self.index_path)
+            self.index_mtime = self.index_path.stat().st_mtime_ns
+        self.db.commit()
+
+    def query(self, query_embeddings, n_results, include_embeddings=False):
+        results = {"ids": [], "documents": []}
+        if include_embeddings:
+            results["embeddings"] = []
+        self._load_index(writable=False)
+        if self.index is None:
+            return results
+
+        _, neighbours = self.index.search(np.asarray(query_embeddings, dtype=np.float32), n_results)
+        for row in neighbours:
+            row_ids = [int(row_id) for row_id in row if row_id != -1]
+            placeholders = ",".join("?" * len(row_ids))
+            found = {
+                row_id: (chunk_id, document)
+                for row_id, chunk_id, document in self.db.execute(
+                    f"SELECT id, chunk_id, document FROM chunks WHERE id IN ({placeholders})", row_ids
+                )
+            }
+            row_ids = [row_id for row_id in row_ids if row_id in found]
+            results["ids"].append([found[row_id][0] for row_id in row_ids])
+            results["documents"].append([found[row_id][1] for row_id in row_ids])
+            if include_embeddings:
+                results["embeddings"].append([self.index.reconstruct(row_id) for row_id in row_ids])
+        return results
+
+
+@functools.cache
+def get_vector_store() -> VectorStore:
+    """Open the configured vector store once and reuse it."""
+    if VECTOR_BACKEND == "faiss":
+        return FaissVectorStore()
+    return ChromaVectorStore()